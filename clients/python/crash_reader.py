@@ -4,24 +4,82 @@ Read crash reports for analysis and improvement
 """
 
 import os
+import logging
 import hmac
 import hashlib
+import threading
+import time
 import requests
-from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional, Any
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple, Union, Any
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Use orjson for response decoding when available
+try:
+    import orjson
+    
+    def _loads(data: bytes) -> Any:
+        return orjson.loads(data)
+except ImportError:
+    import json
+    
+    def _loads(data: bytes) -> Any:
+        return json.loads(data)
+
+
+class CrashReaderError(Exception):
+    """Raised when the crash analytics API cannot be read"""
+
+
+@dataclass(slots=True, frozen=True)
+class ReportQuery:
+    """Query options for read_crash_reports, iter_crash_reports and count_reports"""
+    limit: int = 50
+    offset: int = 0
+    days: int = 30
+    version: Optional[str] = None
+    cursor: Optional[str] = None
+    fields: Optional[Tuple[str, ...]] = None
+
+    def __post_init__(self):
+        # Accept 'id,error_message' as well as a sequence of column names
+        fields = self.fields
+        if isinstance(fields, str):
+            fields = [name.strip() for name in fields.split(',')]
+        if fields:
+            fields = tuple(name for name in fields if name) or None
+        object.__setattr__(self, 'fields', fields or None)
+
+    @classmethod
+    def from_options(cls, options: Dict[str, Any]) -> 'ReportQuery':
+        """Build a query from a read options dictionary"""
+        return cls(
+            limit=options.get('limit', 50),
+            offset=options.get('offset', 0),
+            days=options.get('days', 30),
+            version=options.get('version'),
+            cursor=options.get('cursor'),
+            fields=options.get('fields')
+        )
+
 
 class CrashReader:
+    _CACHE_MAXSIZE = 128
+    _DEFAULT_CACHE_TTL = 30
+
     def __init__(self, config: Optional[Dict[str, str]] = None):
         """
         Initialize the crash reader client
         
         Args:
             config: Configuration dictionary with apiEndpoint, hmacSecret, appName, appVersion
+                and optional cacheTtl (seconds to reuse identical responses, 0 disables; default: 30)
         """
         if config is None:
             config = {}
@@ -37,73 +95,188 @@ class CrashReader:
         if not self.app_name:
             raise ValueError('appName is required')
 
-    def generate_read_signature(self) -> str:
-        """Generate HMAC signature for read requests"""
-        return hmac.new(
-            self.hmac_secret.encode('utf-8'),
-            'read'.encode('utf-8'),
+        # The read signature only depends on the secret, so compute it once
+        self._hmac_key = self.hmac_secret.encode('utf-8')
+        self._read_signature = hmac.new(
+            self._hmac_key,
+            b'read',
             hashlib.sha256
         ).hexdigest()
+        self._read_sig_header = f'sha256={self._read_signature}'
+
+        # URLs and headers are the same for every call, so build them once
+        base = self.api_endpoint.rstrip('/')
+        self._urls = {
+            '': self.api_endpoint,
+            '/stats': f'{base}/stats',
+            '/search': f'{base}/search',
+            '/count': f'{base}/count'
+        }
+        self._read_headers = {
+            'Content-Type': 'application/json',
+            'X-HMAC-Signature': self._read_sig_header,
+            'X-App-Name': self.app_name,
+            'X-App-Version': self.app_version or ''
+        }
+        self._stream_headers = {**self._read_headers, 'Accept': 'application/x-ndjson'}
+
+        # Reuse pooled keep-alive connections across read calls
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            max_retries=Retry(total=2, backoff_factor=0.2,
+                              status_forcelist=[502, 503, 504], raise_on_status=False)
+        )
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+
+        # Short-lived LRU cache of raw GET responses keyed by (path, params)
+        self._cache_ttl = config.get('cacheTtl', self._DEFAULT_CACHE_TTL)
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def close(self):
+        """Close pooled HTTP connections"""
+        self._session.close()
+
+    def invalidate(self):
+        """Drop all cached responses so the next reads hit the API"""
+        with self._cache_lock:
+            self._cache.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
 
-    def read_crash_reports(self, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def generate_read_signature(self) -> str:
+        """Generate HMAC signature for read requests"""
+        return self._read_signature
+
+    def _get(self, path: str, params: Dict[str, str], what: str) -> Any:
+        """Send a signed GET request to a read endpoint and decode the JSON response"""
+        key = (path, tuple(sorted(params.items())))
+        if self._cache_ttl:
+            with self._cache_lock:
+                entry = self._cache.get(key)
+                if entry and time.monotonic() - entry[0] < self._cache_ttl:
+                    self._cache.move_to_end(key)
+                    return _loads(entry[1])
+
+        try:
+            response = self._session.get(
+                self._urls[path],
+                params=params,
+                headers=self._read_headers,
+                timeout=30
+            )
+            
+            response.raise_for_status()
+            data = _loads(response.content)
+            
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise CrashReaderError(f'Failed to {what}: {str(e)}') from e
+
+        # Cache the raw body so every hit decodes a fresh, caller-owned object
+        if self._cache_ttl:
+            with self._cache_lock:
+                self._cache[key] = (time.monotonic(), response.content)
+                self._cache.move_to_end(key)
+                if len(self._cache) > self._CACHE_MAXSIZE:
+                    self._cache.popitem(last=False)
+
+        return data
+
+    def _read_params(self, query: Union[ReportQuery, Dict[str, Any], None]) -> Dict[str, str]:
+        """Translate read options into query parameters for the read endpoint"""
+        if query is None:
+            query = ReportQuery()
+        elif not isinstance(query, ReportQuery):
+            query = ReportQuery.from_options(query)
+
+        # Build query string
+        params = {}
+        if query.limit != 50:
+            params['limit'] = str(query.limit)
+        if query.cursor:
+            params['cursor'] = query.cursor
+        elif query.offset != 0:
+            params['offset'] = str(query.offset)
+        if query.days != 30:
+            params['days'] = str(query.days)
+        version = query.version or self.app_version
+        if version:
+            params['version'] = version
+        if query.fields:
+            params['fields'] = ','.join(query.fields)
+
+        return params
+
+    def read_crash_reports(self, options: Union[ReportQuery, Dict[str, Any], None] = None) -> Dict[str, Any]:
         """
         Read crash reports with optional filtering
         
         Args:
-            options: Query options dictionary
+            options: ReportQuery, or a query options dictionary with the same keys
                 - limit: Number of reports to fetch (1-100, default: 50)
-                - offset: Pagination offset (default: 0)
+                - cursor: Opaque cursor from a previous page's pagination.next_cursor
+                - offset: Pagination offset (default: 0, ignored when cursor is given)
                 - days: Number of days to look back (1-365, default: 30)
-                - version: Filter by app version (optional)
+                - version: Filter by app version (optional, default: appVersion)
+                - fields: Columns to return, as a sequence or 'a,b' string (optional, id and
+                  created_at are always included)
                 
         Returns:
             Dictionary containing crash reports data
         """
-        if options is None:
-            options = {}
-            
-        limit = options.get('limit', 50)
-        offset = options.get('offset', 0)
-        days = options.get('days', 30)
-        version = options.get('version', self.app_version)
-
-        # Build query string
-        params = {}
-        if limit != 50:
-            params['limit'] = str(limit)
-        if offset != 0:
-            params['offset'] = str(offset)
-        if days != 30:
-            params['days'] = str(days)
-        if version:
-            params['version'] = version
+        return self._get('', self._read_params(options), 'read crash reports')
 
-        signature = self.generate_read_signature()
+    def iter_crash_reports(self, options: Union[ReportQuery, Dict[str, Any], None] = None,
+                           max_pages: Optional[int] = 1) -> Iterator[Dict[str, Any]]:
+        """
+        Stream crash reports, yielding each report as it arrives
         
-        headers = {
-            'Content-Type': 'application/json',
-            'X-HMAC-Signature': f'sha256={signature}',
-            'X-App-Name': self.app_name,
-            'X-App-Version': self.app_version or ''
-        }
+        Args:
+            options: Same query options as read_crash_reports; limit is the page size
+            max_pages: Pages to read by following the API's next cursor (default: 1,
+                the same reports read_crash_reports returns; None reads every page)
+                
+        Yields:
+            Crash report dictionaries, without buffering whole pages (stop iterating
+            to stop fetching)
+        """
+        params = self._read_params(options)
+        pages = 0
 
         try:
-            response = requests.get(
-                self.api_endpoint,
-                params=params,
-                headers=headers,
-                timeout=30
-            )
-            
-            response.raise_for_status()
-            return response.json()
-            
-        except requests.exceptions.RequestException as e:
-            raise Exception(f'Failed to read crash reports: {str(e)}')
+            while True:
+                pages += 1
+                with self._session.get(
+                    self._urls[''],
+                    params=params,
+                    headers=self._stream_headers,
+                    timeout=30,
+                    stream=True
+                ) as response:
+                    response.raise_for_status()
+                    for line in response.iter_lines():
+                        if line:
+                            yield _loads(line)
+                    next_cursor = response.headers.get('X-Next-Cursor')
+
+                if not next_cursor or (max_pages is not None and pages >= max_pages):
+                    return
+                params['cursor'] = next_cursor
+                params.pop('offset', None)
+                        
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise CrashReaderError(f'Failed to stream crash reports: {str(e)}') from e
 
     def get_crash_stats(self, days: int = 30) -> Dict[str, Any]:
         """
-        Get crash statistics for the app
+        Get crash statistics for the app, aggregated server-side
         
         Args:
             days: Number of days to analyze (default: 30)
@@ -111,61 +284,16 @@ class CrashReader:
         Returns:
             Dictionary containing crash statistics
         """
-        reports = self.read_crash_reports({'days': days, 'limit': 100})
-        
-        if not reports.get('success') or not reports.get('data'):
-            raise Exception('Failed to fetch crash reports for statistics')
-
-        crash_data = reports['data']
-        
-        # Calculate statistics
-        stats = {
-            'total_crashes': len(crash_data),
-            'unique_users': len(set(r.get('user_id') for r in crash_data if r.get('user_id'))),
-            'unique_sessions': len(set(r.get('session_id') for r in crash_data if r.get('session_id'))),
-            'platforms': {},
-            'versions': {},
-            'top_errors': {},
-            'time_distribution': {
-                'last_24h': 0,
-                'last_7d': 0,
-                'last_30d': 0
-            }
-        }
-
-        now = datetime.now(timezone.utc)
-        one_day_ago = now - timedelta(days=1)
-        seven_days_ago = now - timedelta(days=7)
-        thirty_days_ago = now - timedelta(days=30)
-
-        for report in crash_data:
-            crash_time = datetime.fromisoformat(report['crash_timestamp'].replace('Z', '+00:00'))
-            
-            # Platform stats
-            platform = report.get('platform', 'unknown')
-            stats['platforms'][platform] = stats['platforms'].get(platform, 0) + 1
-            
-            # Version stats
-            version = report.get('app_version', 'unknown')
-            stats['versions'][version] = stats['versions'].get(version, 0) + 1
-            
-            # Error stats
-            error = report.get('error_message', 'unknown')
-            stats['top_errors'][error] = stats['top_errors'].get(error, 0) + 1
-            
-            # Time distribution
-            if crash_time >= one_day_ago:
-                stats['time_distribution']['last_24h'] += 1
-            if crash_time >= seven_days_ago:
-                stats['time_distribution']['last_7d'] += 1
-            if crash_time >= thirty_days_ago:
-                stats['time_distribution']['last_30d'] += 1
+        params = {'days': str(days)}
+        if self.app_version:
+            params['version'] = self.app_version
 
-        # Sort top errors
-        sorted_errors = sorted(stats['top_errors'].items(), key=lambda x: x[1], reverse=True)
-        stats['top_errors'] = dict(sorted_errors[:10])
+        response = self._get('/stats', params, 'fetch crash statistics')
+        
+        if not response.get('success'):
+            raise CrashReaderError('Failed to fetch crash statistics')
 
-        return stats
+        return response['data']
 
     def get_recent_crashes(self, hours: int = 24) -> List[Dict[str, Any]]:
         """
@@ -181,38 +309,78 @@ class CrashReader:
         reports = self.read_crash_reports({'days': days, 'limit': 100})
         
         if not reports.get('success'):
-            raise Exception('Failed to fetch recent crashes')
+            raise CrashReaderError('Failed to fetch recent crashes')
 
         return reports.get('data', [])
 
     def get_crashes_by_error(self, error_message: str, days: int = 30) -> List[Dict[str, Any]]:
         """
-        Get crashes by error message
+        Get the newest crashes (up to 100) whose error message contains the given text
         
         Args:
-            error_message: Error message to search for
+            error_message: Error message to search for (empty matches every report)
             days: Days to look back (default: 30)
             
         Returns:
             List of matching crash reports
         """
-        reports = self.read_crash_reports({'days': days, 'limit': 100})
+        params = {'q': error_message, 'days': str(days)}
+        if self.app_version:
+            params['version'] = self.app_version
+
+        reports = self._get('/search', params, 'fetch crashes')
         
         if not reports.get('success'):
-            raise Exception('Failed to fetch crashes')
+            raise CrashReaderError('Failed to fetch crashes')
+
+        return reports.get('data', [])
+
+    def count_reports(self, options: Union[ReportQuery, Dict[str, Any], None] = None,
+                      q: Optional[str] = None) -> int:
+        """
+        Count crash reports without downloading them
+        
+        Args:
+            options: ReportQuery, or a query options dictionary; only days and
+                version apply (a dictionary may also carry q)
+            q: Only count reports whose error message contains this text (optional)
+                
+        Returns:
+            Number of matching crash reports
+        """
+        if options is None:
+            options = ReportQuery()
+        elif not isinstance(options, ReportQuery):
+            q = q or options.get('q')
+            options = ReportQuery.from_options(options)
+
+        params = {'days': str(options.days)}
+        version = options.version or self.app_version
+        if version:
+            params['version'] = version
+        if q:
+            params['q'] = q
 
-        crash_data = reports.get('data', [])
-        error_lower = error_message.lower()
+        response = self._get('/count', params, 'count crash reports')
         
-        return [
-            report for report in crash_data
-            if report.get('error_message') and 
-            error_lower in report['error_message'].lower()
-        ]
+        if not response.get('success'):
+            raise CrashReaderError('Failed to count crash reports')
+
+        return response['count']
+
+    def count_recent_crashes(self, hours: int = 24) -> int:
+        """Count recent crashes, using the same window as get_recent_crashes"""
+        return self.count_reports(ReportQuery(days=max(1, hours // 24)))
+
+    def count_crashes_by_error(self, error_message: str, days: int = 30) -> int:
+        """Count crashes whose error message contains the given text"""
+        return self.count_reports(ReportQuery(days=days), q=error_message)
 
 
 # Example usage
 if __name__ == '__main__':
+    logging.basicConfig(format='%(levelname)s %(message)s')
+    
     # Initialize the crash reader
     reader = CrashReader({
         'appName': 'test-python-app',
@@ -238,5 +406,5 @@ if __name__ == '__main__':
         error_crashes = reader.get_crashes_by_error("Test crash", 7)
         print(f"Found {len(error_crashes)} crashes with 'Test crash' in the last 7 days")
         
-    except Exception as e:
-        print(f"❌ Error: {e}")
+    except CrashReaderError:
+        logging.getLogger(__name__).exception("❌ Error reading crash reports")
@@ -4,16 +4,21 @@ Universal Crash Reporter for Python Applications
 Automatically catches and reports crashes to your crash analytics API
 """
 
+import atexit
 import json
 import hashlib
 import hmac
 import platform
-import psutil
-import requests
+import queue
+import threading
 import time
+import traceback
 import uuid
 import os
+from collections import deque
 from datetime import datetime, timezone
+from functools import lru_cache
+from json.encoder import encode_basestring_ascii
 from typing import Dict, Any, Optional
 
 # Load environment variables from .env file
@@ -24,8 +29,71 @@ except ImportError:
     # If python-dotenv is not available, continue without it
     pass
 
+# Use orjson for payload encoding when available (returns bytes directly)
+try:
+    import orjson
+    _HAVE_ORJSON = True
+    
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    _HAVE_ORJSON = False
+    
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+# Experimental templated encoder for the fixed crash payload shape; only
+# worth it over stdlib json, orjson is faster still
+_FAST_JSON = os.getenv('CRASH_REPORTER_FAST_JSON') == '1' and not _HAVE_ORJSON
+
+_CRASH_PAYLOAD_TEMPLATE = (
+    b'{"app_name":%b,"app_version":%b,"platform":%b,"crash_timestamp":%b,'
+    b'"error_message":%b,"stack_trace":%b,"hardware_specs":%b,"user_id":%b,"session_id":%b}'
+)
+
+_PAYLOAD_STRING_FIELDS = (
+    'app_name', 'app_version', 'platform', 'crash_timestamp',
+    'error_message', 'stack_trace', 'session_id'
+)
+
+
+def _json_str(value: str) -> bytes:
+    return encode_basestring_ascii(value).encode('ascii')
+
+
+@lru_cache(maxsize=None)
+def _static_platform_info() -> Dict[str, str]:
+    """OS and interpreter details, which never change for the life of the process"""
+    return {
+        'system': platform.system(),
+        'release': platform.release(),
+        'arch': platform.architecture()[0],
+        'python_version': platform.python_version()
+    }
+
+
+@lru_cache(maxsize=None)
+def _processor_model() -> str:
+    """CPU model string (platform.processor() may spawn uname on Linux)"""
+    return platform.processor() or 'Unknown'
+
 
 class CrashReporter:
+    # Seconds a hardware snapshot is reused before psutil is queried again
+    _HARDWARE_SPECS_TTL = 60
+    # Pending reports held for the background sender before falling back locally
+    _QUEUE_MAXSIZE = 128
+    # Seconds allowed at interpreter exit to send queued reports
+    _FLUSH_TIMEOUT = 5
+    # Oldest locally stored crashes are dropped beyond this many
+    _MAX_LOCAL_CRASHES = 1024
+    # Consecutive API failures (within the cooldown window) that open the circuit
+    _CIRCUIT_FAILURE_THRESHOLD = 3
+    # Seconds to skip the API and store locally once the circuit is open
+    _CIRCUIT_COOLDOWN = 60
+    # The API rejects stack traces of 20000 characters or more
+    _MAX_STACK_TRACE_LENGTH = 19999
+    
     def __init__(self, config: Dict[str, Any]):
         self.config = {
             'app_name': config['app_name'],
@@ -38,7 +106,42 @@ class CrashReporter:
             **config
         }
         
-        self.local_crashes = []
+        # Hot-path settings as plain attributes
+        self.app_name = self.config['app_name']
+        self.app_version = self.config['app_version']
+        self.api_endpoint = self.config['api_endpoint']
+        self.hmac_secret = self.config['hmac_secret']
+        self.user_id = self.config.get('user_id')
+        self.session_id = self.config['session_id']
+        self.platform_name = self.config['platform']
+        
+        # Pre-keyed HMAC, copied per payload to skip the key schedule
+        self._hmac_proto = hmac.new(self.hmac_secret.encode('utf-8'), b'', hashlib.sha256)
+        
+        # HTTP session is created on the first report (see _get_session)
+        self._session = None
+        
+        self._hw_cache = None
+        self._hw_cache_ts = 0.0
+        # (specs dict, its encoded JSON) for the templated payload encoder
+        self._hw_json = (None, b'')
+        
+        # Circuit breaker state for a degraded API
+        self._consec_failures = 0
+        self._last_failure_ts = 0.0
+        self._cb_open_until = 0.0
+        
+        self.local_crashes = deque(maxlen=self._MAX_LOCAL_CRASHES)
+        
+        # Optionally send reports from a daemon thread so crashing code never waits on the network
+        self._queue = None
+        if self.config.get('background_reporting'):
+            self._queue = queue.Queue(maxsize=self._QUEUE_MAXSIZE)
+            self._worker = threading.Thread(target=self._drain_queue, args=(self._queue,),
+                                            name='crash-reporter', daemon=True)
+            self._worker.start()
+            atexit.register(self.flush)
+        
         self._install_crash_handlers()
     
     def _generate_session_id(self) -> str:
@@ -57,94 +160,181 @@ class CrashReporter:
         }
         return platform_map.get(system, system)
     
+    def _get_session(self):
+        """Pooled keep-alive session, imported and built on first use"""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            
+            # No transport retries: each send is one attempt bounded by its timeout,
+            # and the circuit breaker and local storage handle a failing API
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=8,
+                max_retries=0
+            )
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._session = session
+        return self._session
+    
     def _get_hardware_specs(self) -> Dict[str, Any]:
         """Get hardware specifications"""
+        now = time.monotonic()
+        if self._hw_cache and now - self._hw_cache_ts < self._HARDWARE_SPECS_TTL:
+            return self._hw_cache
+        
+        # psutil is imported lazily; if it is missing the fallbacks below apply
+        try:
+            import psutil
+        except ImportError:
+            psutil = None
+        
         try:
+            freq = psutil.cpu_freq()
             cpu_info = {
                 'cores': psutil.cpu_count(),
-                'freq': psutil.cpu_freq().current if psutil.cpu_freq() else 0,
-                'model': platform.processor() or 'Unknown'
+                'freq': freq.current if freq else 0,
+                'model': _processor_model()
             }
         except:
             cpu_info = {'cores': 0, 'freq': 0, 'model': 'Unknown'}
         
         try:
+            vm = psutil.virtual_memory()
             memory_info = {
-                'total': psutil.virtual_memory().total,
-                'available': psutil.virtual_memory().available,
-                'used': psutil.virtual_memory().used
+                'total': vm.total,
+                'available': vm.available,
+                'used': vm.used
             }
         except:
             memory_info = {'total': 0, 'available': 0, 'used': 0}
         
-        platform_info = {
-            'system': platform.system(),
-            'release': platform.release(),
-            'arch': platform.architecture()[0],
-            'python_version': platform.python_version()
-        }
-        
-        return {
+        self._hw_cache = {
             'cpu': cpu_info,
             'memory': memory_info,
-            'platform': platform_info
+            'platform': dict(_static_platform_info())
         }
+        self._hw_cache_ts = now
+        if _FAST_JSON:
+            self._hw_json = (self._hw_cache, _dumps(self._hw_cache))
+        return self._hw_cache
     
-    def _generate_hmac_signature(self, payload: str) -> str:
+    def _generate_hmac_signature(self, payload: bytes) -> str:
         """Generate HMAC signature for request authentication"""
-        return hmac.new(
-            self.config['hmac_secret'].encode('utf-8'),
-            payload.encode('utf-8'),
-            hashlib.sha256
-        ).hexdigest()
+        h = self._hmac_proto.copy()
+        h.update(payload)
+        return h.hexdigest()
     
-    def send_crash_report(self, error: Exception, stack_trace: Optional[str] = None) -> Dict[str, Any]:
-        """Send crash report to the API"""
-        crash_data = {
-            'app_name': self.config['app_name'],
-            'app_version': self.config['app_version'],
-            'platform': self.config['platform'],
+    def _format_stack_trace(self, error: Exception) -> str:
+        """Format the traceback carried by error, keeping the innermost frames within the API limit"""
+        lines = traceback.format_exception(type(error), error, getattr(error, '__traceback__', None))
+        return ''.join(lines)[-self._MAX_STACK_TRACE_LENGTH:]
+    
+    def _build_crash_data(self, error: Exception, stack_trace: Optional[str] = None) -> Dict[str, Any]:
+        """Build the crash report payload"""
+        return {
+            'app_name': self.app_name,
+            'app_version': self.app_version,
+            'platform': self.platform_name,
             'crash_timestamp': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
             'error_message': str(error),
-            'stack_trace': stack_trace or str(error.__traceback__),
+            'stack_trace': stack_trace or self._format_stack_trace(error),
             'hardware_specs': self._get_hardware_specs(),
-            'user_id': self.config['user_id'],
-            'session_id': self.config['session_id']
+            'user_id': self.user_id,
+            'session_id': self.session_id
         }
+    
+    def send_crash_report(self, error: Exception, stack_trace: Optional[str] = None) -> Dict[str, Any]:
+        """Send crash report to the API"""
+        return self._send_crash_data(self._build_crash_data(error, stack_trace))
+    
+    def _encode_crash_data(self, crash_data: Dict[str, Any]) -> bytes:
+        """Encode a crash payload, using the fixed-shape template when enabled"""
+        if not _FAST_JSON:
+            return _dumps(crash_data)
+        
+        specs, specs_json = self._hw_json
+        user_id = crash_data.get('user_id')
+        if (len(crash_data) != len(_PAYLOAD_STRING_FIELDS) + 2
+                or crash_data.get('hardware_specs') is not specs
+                or not (user_id is None or isinstance(user_id, str))
+                or not all(isinstance(crash_data.get(k), str) for k in _PAYLOAD_STRING_FIELDS)):
+            # Anything unexpected goes through the generic encoder
+            return _dumps(crash_data)
         
-        payload = json.dumps(crash_data)
+        return _CRASH_PAYLOAD_TEMPLATE % (
+            _json_str(crash_data['app_name']),
+            _json_str(crash_data['app_version']),
+            _json_str(crash_data['platform']),
+            _json_str(crash_data['crash_timestamp']),
+            _json_str(crash_data['error_message']),
+            _json_str(crash_data['stack_trace']),
+            specs_json,
+            b'null' if user_id is None else _json_str(user_id),
+            _json_str(crash_data['session_id'])
+        )
+    
+    def _send_crash_data(self, crash_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Sign and post a crash report payload"""
+        if time.monotonic() < self._cb_open_until:
+            raise Exception("Failed to send crash report: API circuit open after repeated failures")
+        
+        payload = self._encode_crash_data(crash_data)
         signature = self._generate_hmac_signature(payload)
         
         headers = {
             'Content-Type': 'application/json',
             'X-HMAC-Signature': f'sha256={signature}',
-            'X-App-Name': self.config['app_name']
+            'X-App-Name': self.app_name
         }
         
         try:
-            response = requests.post(
-                self.config['api_endpoint'],
+            response = self._get_session().post(
+                self.api_endpoint,
                 data=payload,
                 headers=headers,
                 timeout=10
             )
             
             if response.status_code == 200:
-                return response.json()
+                result = response.json()
+                self._consec_failures = 0
+                self._cb_open_until = 0.0
+                return result
             else:
-                raise requests.RequestException(f"HTTP {response.status_code}: {response.text}")
+                raise Exception(f"HTTP {response.status_code}: {response.text}")
                 
         except Exception as e:
+            self._record_api_failure()
             raise Exception(f"Failed to send crash report: {str(e)}")
     
+    def _record_api_failure(self):
+        """Count a failed send and open the circuit after repeated failures"""
+        now = time.monotonic()
+        if self._cb_open_until:
+            # The first attempt after a cooldown failed, so reopen straight away
+            self._cb_open_until = now + self._CIRCUIT_COOLDOWN
+            return
+        
+        if now - self._last_failure_ts > self._CIRCUIT_COOLDOWN:
+            self._consec_failures = 0
+        self._last_failure_ts = now
+        self._consec_failures += 1
+        
+        if self._consec_failures >= self._CIRCUIT_FAILURE_THRESHOLD:
+            self._cb_open_until = now + self._CIRCUIT_COOLDOWN
+            self._consec_failures = 0
+    
     def store_crash_locally(self, error: Exception, stack_trace: Optional[str] = None) -> Dict[str, Any]:
         """Store crash report locally if API fails"""
         crash_data = {
             'timestamp': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
             'error': str(error),
-            'stack': stack_trace or str(error.__traceback__),
-            'app_name': self.config['app_name'],
-            'app_version': self.config['app_version']
+            'stack': stack_trace or self._format_stack_trace(error),
+            'app_name': self.app_name,
+            'app_version': self.app_version
         }
         
         self.local_crashes.append(crash_data)
@@ -153,14 +343,58 @@ class CrashReporter:
     
     def report_crash(self, error: Exception, stack_trace: Optional[str] = None) -> Dict[str, Any]:
         """Report a crash with automatic fallback"""
+        crash_data = self._build_crash_data(error, stack_trace)
+        
+        if self._queue is not None:
+            try:
+                self._queue.put_nowait((error, stack_trace, crash_data))
+                return {'queued': True}
+            except queue.Full:
+                return self.store_crash_locally(error, stack_trace)
+        
+        return self._deliver(error, stack_trace, crash_data)
+    
+    def _deliver(self, error: Exception, stack_trace: Optional[str], crash_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Send a built crash report, storing it locally if the API fails"""
         try:
-            result = self.send_crash_report(error, stack_trace)
+            result = self._send_crash_data(crash_data)
             print(f"Crash report sent successfully: {result}")
             return result
         except Exception as api_error:
             print(f"Warning: Failed to send crash report to API: {str(api_error)}")
             return self.store_crash_locally(error, stack_trace)
     
+    def _drain_queue(self, pending: queue.Queue):
+        """Background sender loop"""
+        while True:
+            item = pending.get()
+            if item is None:
+                # Stop sentinel from close()
+                pending.task_done()
+                return
+            error, stack_trace, crash_data = item
+            try:
+                self._deliver(error, stack_trace, crash_data)
+            except Exception:
+                # Never let a bad report kill the sender thread
+                pass
+            finally:
+                pending.task_done()
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for queued crash reports to be sent, up to timeout seconds"""
+        if self._queue is None:
+            return True
+        
+        deadline = time.monotonic() + (self._FLUSH_TIMEOUT if timeout is None else timeout)
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+    
     def report_error(self, error: Exception, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Manually report an error with context"""
         enhanced_error = Exception(f"{str(error)} | Context: {context or {}}")
@@ -177,18 +411,34 @@ class CrashReporter:
                 return
             
             print(f"Uncaught Exception: {exc_value}")
-            self.report_crash(exc_value, str(exc_traceback))
+            self.report_crash(exc_value)
             sys.__excepthook__(exc_type, exc_value, exc_traceback)
         
         sys.excepthook = handle_exception
     
     def get_local_crashes(self) -> list:
         """Get locally stored crashes"""
-        return self.local_crashes.copy()
+        return list(self.local_crashes)
     
     def clear_local_crashes(self):
         """Clear locally stored crashes"""
         self.local_crashes.clear()
+    
+    def close(self):
+        """Stop the background sender (after flushing it) and close pooled HTTP connections"""
+        if self._queue is not None:
+            self.flush()
+            atexit.unregister(self.flush)
+            pending, self._queue = self._queue, None
+            try:
+                pending.put(None, timeout=self._FLUSH_TIMEOUT)
+                self._worker.join(self._FLUSH_TIMEOUT)
+            except queue.Full:
+                pass
+        
+        if self._session is not None:
+            self._session.close()
+            self._session = None
 
 
 def install_crash_handler(config: Dict[str, Any]) -> CrashReporter:
@@ -6,70 +6,135 @@ Test the crash reading functionality
 
 import sys
 import os
-from crash_reader import CrashReader
+import json
+import importlib.util
+from dataclasses import replace
+import pytest
+from crash_reader import CrashReader, ReportQuery
 
-def test_crash_reader():
-    """Test the crash reader functionality"""
-    print("🧪 Testing Crash Reader Functionality")
-    print("=====================================")
-    
-    # Initialize the crash reader
-    reader = CrashReader({
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+@pytest.fixture(scope='session')
+def reader():
+    """Shared crash reader for the live API tests"""
+    if not os.getenv('API_ENDPOINT') or not os.getenv('HMAC_SECRET'):
+        pytest.skip('API_ENDPOINT and HMAC_SECRET are required for the reader tests')
+
+    # The context manager closes the reader's pooled connections
+    with CrashReader({
         'appName': 'test-python-app',
         'appVersion': 'v1.0.0'
-    })
-    
-    try:
-        # Test 1: Read recent crashes
-        print("\n📊 Test 1: Reading recent crashes (last 24 hours)")
-        recent_crashes = reader.get_recent_crashes(24)
-        print(f"✅ Found {len(recent_crashes)} recent crashes")
-        
-        if recent_crashes:
-            print("📋 Sample crash report:")
-            import json
-            print(json.dumps(recent_crashes[0], indent=2))
-        
-        # Test 2: Get crash statistics
-        print("\n📈 Test 2: Getting crash statistics (last 30 days)")
-        stats = reader.get_crash_stats(30)
-        print("✅ Crash statistics retrieved successfully")
-        print(f"📊 Total crashes: {stats['total_crashes']}")
-        print(f"👥 Unique users affected: {stats['unique_users']}")
-        print(f"🖥️  Platforms: {stats['platforms']}")
-        print(f"📱 Versions: {stats['versions']}")
-        print(f"⚠️  Top errors: {list(stats['top_errors'].keys())[:3]}")
-        print(f"⏰ Time distribution: {stats['time_distribution']}")
-        
-        # Test 3: Search for specific errors
-        print("\n🔍 Test 3: Searching for specific errors")
-        error_crashes = reader.get_crashes_by_error("Test crash", 7)
-        print(f"✅ Found {len(error_crashes)} crashes with 'Test crash' in the last 7 days")
-        
-        # Test 4: Read with pagination
-        print("\n📄 Test 4: Testing pagination")
-        paginated_reports = reader.read_crash_reports({
-            'limit': 5,
-            'offset': 0,
-            'days': 30
-        })
-        print(f"✅ Retrieved {len(paginated_reports['data'])} reports")
-        print(f"📊 Pagination info: {paginated_reports['pagination']}")
-        
-        # Test 5: Filter by version
-        print("\n🔧 Test 5: Filtering by version")
-        version_reports = reader.read_crash_reports({
-            'version': 'v1.0.0',
-            'days': 30
-        })
-        print(f"✅ Found {len(version_reports['data'])} crashes for version v1.0.0")
-        
-        print("\n🎉 All crash reader tests completed successfully!")
-        print("📚 Your crash reading functionality is working correctly")
-        
-    except Exception as e:
-        print(f"❌ Crash reader test failed: {e}")
-        sys.exit(1)
+    }) as reader:
+        yield reader
+
+
+def test_recent_crashes(reader, request):
+    """Test 1: Read recent crashes"""
+    print("\n📊 Test 1: Reading recent crashes (last 24 hours)")
+    # Only a number is printed, so ask the API for a count instead of rows
+    recent_count = reader.count_recent_crashes(24)
+    print(f"✅ Found {recent_count} recent crashes")
+    assert isinstance(recent_count, int)
+    # The last day is part of the last 30 days
+    assert recent_count <= reader.count_reports(ReportQuery(days=30))
+
+    # The sample report is only worth fetching and formatting if someone reads it
+    if not (sys.stdout.isatty() or request.config.getoption('verbose') > 0):
+        return
+
+    sample = reader.read_crash_reports(ReportQuery(days=1, limit=1))['data']
+    if sample:
+        print("📋 Sample crash report:")
+        if orjson is not None:
+            sys.stdout.flush()
+            sys.stdout.buffer.write(orjson.dumps(sample[0], option=orjson.OPT_INDENT_2) + b'\n')
+        else:
+            print(json.dumps(sample[0], indent=2))
+
+
+def test_crash_stats(reader):
+    """Test 2: Get crash statistics"""
+    print("\n📈 Test 2: Getting crash statistics (last 30 days)")
+    stats = reader.get_crash_stats(30)
+    print("✅ Crash statistics retrieved successfully")
+    print(f"📊 Total crashes: {stats['total_crashes']}")
+    print(f"👥 Unique users affected: {stats['unique_users']}")
+    print(f"🖥️  Platforms: {stats['platforms']}")
+    print(f"📱 Versions: {stats['versions']}")
+    print(f"⚠️  Top errors: {list(stats['top_errors'].keys())[:3]}")
+    print(f"⏰ Time distribution: {stats['time_distribution']}")
+
+    assert isinstance(stats['total_crashes'], int)
+    distribution = stats['time_distribution']
+    assert set(distribution) == {'last_24h', 'last_7d', 'last_30d'}
+    assert distribution['last_24h'] <= distribution['last_7d'] <= distribution['last_30d']
+
+
+def test_crashes_by_error(reader):
+    """Test 3: Search for specific errors"""
+    print("\n🔍 Test 3: Searching for specific errors")
+    error_count = reader.count_crashes_by_error("Test crash", 7)
+    print(f"✅ Found {error_count} crashes with 'Test crash' in the last 7 days")
+    assert isinstance(error_count, int)
+    # /search returns at most 100 of the reports /count counts
+    assert error_count >= len(reader.get_crashes_by_error("Test crash", 7))
+
+
+def test_pagination(reader):
+    """Test 4: Read with pagination"""
+    print("\n📄 Test 4: Testing pagination")
+    query = ReportQuery(limit=5, days=30, fields=('id', 'created_at', 'error_message'))
+    paginated_reports = reader.read_crash_reports(query)
+    print(f"✅ Retrieved {len(paginated_reports['data'])} reports")
+    print(f"📊 Pagination info: {paginated_reports['pagination']}")
+    assert len(paginated_reports['data']) <= 5
+
+    next_cursor = paginated_reports['pagination'].get('next_cursor')
+    if next_cursor:
+        next_page = reader.read_crash_reports(replace(query, cursor=next_cursor))
+        print(f"✅ Retrieved {len(next_page['data'])} reports from the next page")
+
+
+def test_streaming(reader):
+    """Test 4b: Stream reports across pages"""
+    print("\n🌊 Test 4b: Streaming reports (last 24 hours, up to 3 pages of 5)")
+    query = ReportQuery(limit=5, days=1, fields=('id', 'created_at'))
+    # A few pages are enough to check the cursor hand-off without tripping the rate limit
+    ids = [report['id'] for report in reader.iter_crash_reports(query, max_pages=3)]
+    print(f"✅ Streamed {len(ids)} reports")
+    assert len(ids) <= 15
+    assert len(ids) == len(set(ids))
+
+    # A single page streams the same reports read_crash_reports returns
+    first_page = [report['id'] for report in reader.iter_crash_reports(query)]
+    assert first_page == ids[:len(first_page)]
+    assert len(first_page) == len(reader.read_crash_reports(query)['data'])
+
+
+def test_version_filter(reader):
+    """Test 5: Filter by version"""
+    print("\n🔧 Test 5: Filtering by version")
+    query = ReportQuery(version='v1.0.0', days=30, limit=5)
+    version_count = reader.count_reports(query)
+    print(f"✅ Found {version_count} crashes for version v1.0.0")
+    assert isinstance(version_count, int)
+    assert version_count >= len(reader.read_crash_reports(query)['data'])
+
 
 if __name__ == '__main__':
-    test_crash_reader()
+    print("🧪 Testing Crash Reader Functionality")
+    print("=====================================")
+
+    # The tests are independent, so --parallel runs them in pytest-xdist worker
+    # processes. Workers' stdout is not forwarded, so report it with -rA instead of -s.
+    if '--parallel' in sys.argv[1:]:
+        if importlib.util.find_spec('xdist') is None:
+            sys.exit('--parallel requires pytest-xdist (pip install pytest-xdist)')
+        args = ['-rA', '-n', 'auto', __file__]
+    else:
+        args = ['-s', __file__]
+    sys.exit(pytest.main(args))
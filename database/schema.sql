@@ -32,11 +32,17 @@ CREATE TABLE crash_reports (
     CONSTRAINT crash_reports_platform_check CHECK (platform IN ('windows', 'linux', 'macos', 'android', 'ios'))
 );
 
+-- Trigram support for error message search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Indexes for performance
 CREATE INDEX idx_crash_reports_app_name ON crash_reports(app_name);
 CREATE INDEX idx_crash_reports_created_at ON crash_reports(created_at DESC);
 CREATE INDEX idx_crash_reports_app_version ON crash_reports(app_name, app_version);
 CREATE INDEX idx_crash_reports_platform ON crash_reports(platform);
+CREATE INDEX idx_crash_reports_keyset ON crash_reports(app_name, app_version, created_at DESC, id DESC);
+CREATE INDEX idx_crash_reports_app_created_at ON crash_reports(app_name, created_at DESC);
+CREATE INDEX idx_crash_reports_error_trgm ON crash_reports USING GIN (error_message gin_trgm_ops);
 
 -- Row Level Security (RLS)
 ALTER TABLE crash_reports ENABLE ROW LEVEL SECURITY;
@@ -69,4 +75,104 @@ SELECT
     COUNT(*) as unique_users
 FROM crash_reports 
 GROUP BY app_name, app_version, platform, DATE_TRUNC('hour', created_at)
-ORDER BY hour DESC;
\ No newline at end of file
+ORDER BY hour DESC;
+
+-- Aggregated crash statistics for the /stats endpoint, computed in a single
+-- scan with GROUPING SETS. Runs as the caller, so RLS still hides rows from
+-- anything but the service key.
+CREATE OR REPLACE FUNCTION crash_stats(p_app_name TEXT, p_days INTEGER, p_app_version TEXT DEFAULT NULL)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+AS $$
+    WITH recent AS (
+        SELECT
+            platform,
+            app_version,
+            COALESCE(error_message, 'unknown') AS error_message,
+            NULLIF(user_id, '') AS user_id,
+            NULLIF(session_id, '') AS session_id,
+            crash_timestamp
+        FROM crash_reports
+        WHERE app_name = p_app_name
+          AND (p_app_version IS NULL OR app_version = p_app_version)
+          AND created_at >= NOW() - make_interval(days => p_days)
+    ),
+    grouped AS (
+        -- grouping_id: 7 = totals, 3 = per platform, 5 = per version, 6 = per error
+        SELECT
+            GROUPING(platform, app_version, error_message) AS grouping_id,
+            platform,
+            app_version,
+            error_message,
+            COUNT(*) AS crash_count,
+            COUNT(DISTINCT user_id) AS unique_users,
+            COUNT(DISTINCT session_id) AS unique_sessions,
+            COUNT(*) FILTER (WHERE crash_timestamp >= NOW() - INTERVAL '1 day') AS last_24h,
+            COUNT(*) FILTER (WHERE crash_timestamp >= NOW() - INTERVAL '7 days') AS last_7d,
+            COUNT(*) FILTER (WHERE crash_timestamp >= NOW() - INTERVAL '30 days') AS last_30d
+        FROM recent
+        GROUP BY GROUPING SETS ((), (platform), (app_version), (error_message))
+    )
+    SELECT json_build_object(
+        'total_crashes', totals.crash_count,
+        'unique_users', totals.unique_users,
+        'unique_sessions', totals.unique_sessions,
+        'platforms', (
+            SELECT COALESCE(json_object_agg(platform, crash_count ORDER BY crash_count DESC, platform), '{}'::json)
+            FROM grouped WHERE grouping_id = 3
+        ),
+        'versions', (
+            SELECT COALESCE(json_object_agg(app_version, crash_count ORDER BY crash_count DESC, app_version), '{}'::json)
+            FROM grouped WHERE grouping_id = 5
+        ),
+        'top_errors', (
+            SELECT COALESCE(json_object_agg(error_message, crash_count ORDER BY crash_count DESC, error_message), '{}'::json)
+            FROM (
+                SELECT error_message, crash_count FROM grouped
+                WHERE grouping_id = 6
+                ORDER BY crash_count DESC, error_message
+                LIMIT 10
+            ) top
+        ),
+        'time_distribution', json_build_object(
+            'last_24h', totals.last_24h,
+            'last_7d', totals.last_7d,
+            'last_30d', totals.last_30d
+        )
+    )
+    FROM grouped totals
+    WHERE totals.grouping_id = 7;
+$$;
+
+-- Case-insensitive substring search over error messages for the /search
+-- endpoint. The search term is matched literally (LIKE wildcards are
+-- escaped) and the trigram index serves the leading-wildcard ILIKE. A NULL
+-- p_query (empty q) matches every report in the window, as on /count.
+CREATE OR REPLACE FUNCTION search_crash_reports(p_app_name TEXT, p_query TEXT, p_days INTEGER, p_app_version TEXT DEFAULT NULL)
+RETURNS SETOF crash_reports
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT *
+    FROM crash_reports
+    WHERE app_name = p_app_name
+      AND (p_app_version IS NULL OR app_version = p_app_version)
+      AND created_at >= NOW() - make_interval(days => p_days)
+      AND (p_query IS NULL OR error_message ILIKE '%' || replace(replace(replace(p_query, '\', '\\'), '%', '\%'), '_', '\_') || '%');
+$$;
+
+-- Number of matching reports for the /count endpoint. Uses the same
+-- filters as the read endpoint, plus the /search match when p_query is set.
+CREATE OR REPLACE FUNCTION count_crash_reports(p_app_name TEXT, p_days INTEGER, p_app_version TEXT DEFAULT NULL, p_query TEXT DEFAULT NULL)
+RETURNS BIGINT
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT COUNT(*)
+    FROM crash_reports
+    WHERE app_name = p_app_name
+      AND (p_app_version IS NULL OR app_version = p_app_version)
+      AND created_at >= NOW() - make_interval(days => p_days)
+      AND (p_query IS NULL OR error_message ILIKE '%' || replace(replace(replace(p_query, '\', '\\'), '%', '\%'), '_', '\_') || '%');
+$$;
\ No newline at end of file
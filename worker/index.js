@@ -6,6 +6,13 @@
 // Rate limiting storage
 const rateLimitKV = new Map(); // In production, use Cloudflare KV
 
+// Columns a reader may request via ?fields= (id and created_at are always
+// returned because the pagination cursor is built from them)
+const READABLE_FIELDS = new Set([
+  'id', 'app_name', 'app_version', 'crash_timestamp', 'platform', 'error_message',
+  'stack_trace', 'hardware_specs', 'user_id', 'session_id', 'created_at'
+]);
+
 export default {
   async fetch(request, env, ctx) {
     // CORS headers
@@ -21,8 +28,18 @@ export default {
       return new Response(null, { headers: corsHeaders });
     }
 
-    // Handle GET requests for reading crash reports
+    // Handle GET requests for reading, searching, counting and summarising crash reports
     if (request.method === 'GET') {
+      const { pathname } = new URL(request.url);
+      if (pathname.endsWith('/stats')) {
+        return await handleCrashStatsRead(request, env, corsHeaders);
+      }
+      if (pathname.endsWith('/search')) {
+        return await handleCrashSearchRead(request, env, corsHeaders);
+      }
+      if (pathname.endsWith('/count')) {
+        return await handleCrashCountRead(request, env, corsHeaders);
+      }
       return await handleCrashReportRead(request, env, corsHeaders);
     }
 
@@ -460,113 +477,362 @@ function getMinimalSchema() {
   `;
 }
 
+/**
+ * Shared checks for read (GET) endpoints: rate limit, read signature and app header
+ * Returns { error: Response } on failure, otherwise { appName, appVersion, version }
+ */
+async function authorizeReadRequest(request, env, corsHeaders) {
+  // Get client IP for rate limiting
+  const clientIP = request.headers.get('CF-Connecting-IP') || 
+                  request.headers.get('X-Forwarded-For') || 
+                  'unknown';
+  
+  // Rate limiting check
+  const rateLimitResult = await checkRateLimit(clientIP, env);
+  if (!rateLimitResult.allowed) {
+    return { error: new Response(JSON.stringify({
+      error: 'Rate limit exceeded',
+      retry_after: rateLimitResult.retry_after
+    }), {
+      status: 429,
+      headers: { ...corsHeaders, 'Content-Type': 'application/json' }
+    }) };
+  }
+
+  // Verify HMAC signature for read requests
+  const signature = request.headers.get('X-HMAC-Signature');
+  if (!signature) {
+    return { error: new Response(JSON.stringify({
+      error: 'Missing signature'
+    }), {
+      status: 401,
+      headers: { ...corsHeaders, 'Content-Type': 'application/json' }
+    }) };
+  }
+  
+  // For GET requests, we'll verify a simple signature
+  // Extract the hex signature from the header
+  const signatureMatch = signature.match(/^sha256=([a-f0-9]+)$/);
+  if (!signatureMatch) {
+    return { error: new Response(JSON.stringify({
+      error: 'Invalid signature format. Expected: sha256=<hex>'
+    }), {
+      status: 401,
+      headers: { ...corsHeaders, 'Content-Type': 'application/json' }
+    }) };
+  }
+  
+  const receivedSignature = signatureMatch[1];
+  
+  // Generate expected signature using Web Crypto API
+  const encoder = new TextEncoder();
+  const key = await crypto.subtle.importKey(
+    'raw',
+    encoder.encode(env.HMAC_SECRET),
+    { name: 'HMAC', hash: 'SHA-256' },
+    false,
+    ['sign']
+  );
+  
+  const data = encoder.encode('read');
+  const expectedSignatureBytes = await crypto.subtle.sign('HMAC', key, data);
+  
+  // Convert ArrayBuffer to hex string
+  const expectedSignature = Array.from(new Uint8Array(expectedSignatureBytes))
+    .map(b => b.toString(16).padStart(2, '0'))
+    .join('');
+  
+  if (receivedSignature !== expectedSignature) {
+    return { error: new Response(JSON.stringify({
+      error: 'Invalid signature'
+    }), {
+      status: 401,
+      headers: { ...corsHeaders, 'Content-Type': 'application/json' }
+    }) };
+  }
+
+  // Get app name from headers
+  const appName = request.headers.get('X-App-Name');
+  const appVersion = request.headers.get('X-App-Version');
+  
+  if (!appName) {
+    return { error: new Response(JSON.stringify({
+      error: 'Missing X-App-Name header'
+    }), {
+      status: 400,
+      headers: { ...corsHeaders, 'Content-Type': 'application/json' }
+    }) };
+  }
+
+  // Every read endpoint scopes to the same version: ?version= if given,
+  // otherwise the caller's X-App-Version, otherwise all versions
+  const version = new URL(request.url).searchParams.get('version') || appVersion || null;
+
+  return { appName, appVersion, version };
+}
+
 /**
  * Handle crash report reading (GET)
  */
 async function handleCrashReportRead(request, env, corsHeaders) {
   try {
-    // Get client IP for rate limiting
-    const clientIP = request.headers.get('CF-Connecting-IP') || 
-                    request.headers.get('X-Forwarded-For') || 
-                    'unknown';
-    
-    // Rate limiting check
-    const rateLimitResult = await checkRateLimit(clientIP, env);
-    if (!rateLimitResult.allowed) {
+    const auth = await authorizeReadRequest(request, env, corsHeaders);
+    if (auth.error) {
+      return auth.error;
+    }
+    const { appName, version } = auth;
+
+    // Parse query parameters
+    const url = new URL(request.url);
+    const limit = parseInt(url.searchParams.get('limit') || '50');
+    const offset = parseInt(url.searchParams.get('offset') || '0');
+    const days = parseInt(url.searchParams.get('days') || '30');
+    const cursorParam = url.searchParams.get('cursor');
+    const fieldsParam = url.searchParams.get('fields');
+    const fields = fieldsParam ? fieldsParam.split(',').map(f => f.trim()).filter(Boolean) : [];
+
+    // Validate parameters
+    if (limit > 100 || limit < 1) {
       return new Response(JSON.stringify({
-        error: 'Rate limit exceeded',
-        retry_after: rateLimitResult.retry_after
+        error: 'Limit must be between 1 and 100'
       }), {
-        status: 429,
+        status: 400,
         headers: { ...corsHeaders, 'Content-Type': 'application/json' }
       });
     }
 
-    // Verify HMAC signature for read requests
-    const signature = request.headers.get('X-HMAC-Signature');
-    if (!signature) {
+    if (offset < 0) {
       return new Response(JSON.stringify({
-        error: 'Missing signature'
+        error: 'Offset must be non-negative'
       }), {
-        status: 401,
+        status: 400,
         headers: { ...corsHeaders, 'Content-Type': 'application/json' }
       });
     }
-    
-    // For GET requests, we'll verify a simple signature
-    // Extract the hex signature from the header
-    const signatureMatch = signature.match(/^sha256=([a-f0-9]+)$/);
-    if (!signatureMatch) {
+
+    if (days > 365 || days < 1) {
       return new Response(JSON.stringify({
-        error: 'Invalid signature format. Expected: sha256=<hex>'
+        error: 'Days must be between 1 and 365'
       }), {
-        status: 401,
+        status: 400,
         headers: { ...corsHeaders, 'Content-Type': 'application/json' }
       });
     }
-    
-    const receivedSignature = signatureMatch[1];
-    
-    // Generate expected signature using Web Crypto API
-    const encoder = new TextEncoder();
-    const key = await crypto.subtle.importKey(
-      'raw',
-      encoder.encode(env.HMAC_SECRET),
-      { name: 'HMAC', hash: 'SHA-256' },
-      false,
-      ['sign']
-    );
-    
-    const data = encoder.encode('read');
-    const expectedSignatureBytes = await crypto.subtle.sign('HMAC', key, data);
-    
-    // Convert ArrayBuffer to hex string
-    const expectedSignature = Array.from(new Uint8Array(expectedSignatureBytes))
-      .map(b => b.toString(16).padStart(2, '0'))
-      .join('');
-    
-    if (receivedSignature !== expectedSignature) {
+
+    const unknownField = fields.find(f => !READABLE_FIELDS.has(f));
+    if (unknownField) {
       return new Response(JSON.stringify({
-        error: 'Invalid signature'
+        error: `Unknown field: ${unknownField}`
       }), {
-        status: 401,
+        status: 400,
         headers: { ...corsHeaders, 'Content-Type': 'application/json' }
       });
     }
 
-    // Get app name from headers
-    const appName = request.headers.get('X-App-Name');
-    const appVersion = request.headers.get('X-App-Version');
-    
-    if (!appName) {
+    const cursor = cursorParam ? decodeCursor(cursorParam) : null;
+    if (cursorParam && !cursor) {
       return new Response(JSON.stringify({
-        error: 'Missing X-App-Name header'
+        error: 'Invalid cursor'
       }), {
         status: 400,
         headers: { ...corsHeaders, 'Content-Type': 'application/json' }
       });
     }
 
-    // Parse query parameters
+    // Filter by app/version/days and page in (created_at, id) order so the
+    // keyset index can serve deep pages without scanning skipped rows
+    const since = new Date(Date.now() - days * 24 * 60 * 60 * 1000).toISOString();
+    const query = new URLSearchParams({
+      app_name: `eq.${appName}`,
+      created_at: `gte.${since}`,
+      order: 'created_at.desc,id.desc',
+      limit: limit.toString()
+    });
+    if (version) {
+      query.set('app_version', `eq.${version}`);
+    }
+    if (fields.length > 0) {
+      query.set('select', [...new Set(['id', 'created_at', ...fields])].join(','));
+    }
+    if (cursor) {
+      query.set('or', `(created_at.lt."${cursor.created_at}",and(created_at.eq."${cursor.created_at}",id.lt.${cursor.id}))`);
+    } else if (offset > 0) {
+      query.set('offset', offset.toString());
+    }
+
+    // Execute query using Supabase REST API
+    const response = await fetch(`${env.SUPABASE_URL}/rest/v1/crash_reports?${query}`, {
+      method: 'GET',
+      headers: {
+        'apikey': env.SUPABASE_SERVICE_KEY,
+        'Authorization': `Bearer ${env.SUPABASE_SERVICE_KEY}`,
+        'Content-Type': 'application/json',
+        'Prefer': 'count=exact'
+      }
+    });
+
+    if (!response.ok) {
+      console.error('Supabase query failed:', response.status, response.statusText);
+      return new Response(JSON.stringify({
+        error: 'Failed to fetch crash reports'
+      }), {
+        status: 500,
+        headers: { ...corsHeaders, 'Content-Type': 'application/json' }
+      });
+    }
+
+    const crashReports = await response.json();
+    const totalCount = parseInt(response.headers.get('Content-Range')?.split('/')[1] || '0');
+
+    // With a cursor, total counts the rows remaining after that cursor
+    const hasMore = cursor ? crashReports.length < totalCount : offset + limit < totalCount;
+    const lastReport = crashReports[crashReports.length - 1];
+    const nextCursor = hasMore && lastReport ? encodeCursor(lastReport) : null;
+
+    // Newline-delimited JSON lets clients consume rows one at a time; the
+    // pagination details move into response headers
+    if ((request.headers.get('Accept') || '').includes('application/x-ndjson')) {
+      const ndjsonHeaders = {
+        ...corsHeaders,
+        'Content-Type': 'application/x-ndjson',
+        'Access-Control-Expose-Headers': 'X-Total-Count, X-Next-Cursor',
+        'X-Total-Count': totalCount.toString()
+      };
+      if (nextCursor) {
+        ndjsonHeaders['X-Next-Cursor'] = nextCursor;
+      }
+
+      return new Response(crashReports.map(report => JSON.stringify(report) + '\n').join(''), {
+        status: 200,
+        headers: ndjsonHeaders
+      });
+    }
+
+    return new Response(JSON.stringify({
+      success: true,
+      data: crashReports,
+      pagination: {
+        limit,
+        offset: cursor ? null : offset,
+        total: totalCount,
+        has_more: hasMore,
+        next_cursor: nextCursor
+      },
+      filters: {
+        app_name: appName,
+        app_version: version,
+        days
+      }
+    }), {
+      status: 200,
+      headers: { ...corsHeaders, 'Content-Type': 'application/json' }
+    });
+
+  } catch (error) {
+    console.error('Read handler error:', error);
+    return new Response(JSON.stringify({
+      error: 'Internal server error'
+    }), {
+      status: 500,
+      headers: { ...corsHeaders, 'Content-Type': 'application/json' }
+    });
+  }
+}
+
+/**
+ * Handle crash statistics reading (GET /stats)
+ * Aggregation runs in the database via the crash_stats() function
+ */
+async function handleCrashStatsRead(request, env, corsHeaders) {
+  try {
+    const auth = await authorizeReadRequest(request, env, corsHeaders);
+    if (auth.error) {
+      return auth.error;
+    }
+
     const url = new URL(request.url);
-    const limit = parseInt(url.searchParams.get('limit') || '50');
-    const offset = parseInt(url.searchParams.get('offset') || '0');
     const days = parseInt(url.searchParams.get('days') || '30');
-    const version = url.searchParams.get('version') || appVersion;
+    const { version } = auth;
 
-    // Validate parameters
-    if (limit > 100 || limit < 1) {
+    if (days > 365 || days < 1) {
       return new Response(JSON.stringify({
-        error: 'Limit must be between 1 and 100'
+        error: 'Days must be between 1 and 365'
       }), {
         status: 400,
         headers: { ...corsHeaders, 'Content-Type': 'application/json' }
       });
     }
 
-    if (offset < 0) {
+    const response = await fetch(`${env.SUPABASE_URL}/rest/v1/rpc/crash_stats`, {
+      method: 'POST',
+      headers: {
+        'apikey': env.SUPABASE_SERVICE_KEY,
+        'Authorization': `Bearer ${env.SUPABASE_SERVICE_KEY}`,
+        'Content-Type': 'application/json'
+      },
+      body: JSON.stringify({
+        p_app_name: auth.appName,
+        p_days: days,
+        p_app_version: version
+      })
+    });
+
+    if (!response.ok) {
+      console.error('Supabase stats query failed:', response.status, response.statusText);
       return new Response(JSON.stringify({
-        error: 'Offset must be non-negative'
+        error: 'Failed to fetch crash statistics'
+      }), {
+        status: 500,
+        headers: { ...corsHeaders, 'Content-Type': 'application/json' }
+      });
+    }
+
+    const stats = await response.json();
+
+    return new Response(JSON.stringify({
+      success: true,
+      data: stats,
+      filters: {
+        app_name: auth.appName,
+        app_version: version,
+        days
+      }
+    }), {
+      status: 200,
+      headers: { ...corsHeaders, 'Content-Type': 'application/json' }
+    });
+
+  } catch (error) {
+    console.error('Stats handler error:', error);
+    return new Response(JSON.stringify({
+      error: 'Internal server error'
+    }), {
+      status: 500,
+      headers: { ...corsHeaders, 'Content-Type': 'application/json' }
+    });
+  }
+}
+
+/**
+ * Handle crash report search by error message (GET /search?q=...)
+ * Matching runs in the database via search_crash_reports() and its trigram index
+ */
+async function handleCrashSearchRead(request, env, corsHeaders) {
+  try {
+    const auth = await authorizeReadRequest(request, env, corsHeaders);
+    if (auth.error) {
+      return auth.error;
+    }
+
+    const url = new URL(request.url);
+    // An empty q means no error message filter, as on /count
+    const q = url.searchParams.get('q') || null;
+    const days = parseInt(url.searchParams.get('days') || '30');
+    const { version } = auth;
+
+    if (q && q.length > 200) {
+      return new Response(JSON.stringify({
+        error: 'Query must be at most 200 characters'
       }), {
         status: 400,
         headers: { ...corsHeaders, 'Content-Type': 'application/json' }
@@ -582,22 +848,25 @@ async function handleCrashReportRead(request, env, corsHeaders) {
       });
     }
 
-    // Execute query using Supabase REST API
-    const response = await fetch(`${env.SUPABASE_URL}/rest/v1/crash_reports`, {
-      method: 'GET',
+    const response = await fetch(`${env.SUPABASE_URL}/rest/v1/rpc/search_crash_reports?order=created_at.desc,id.desc&limit=100`, {
+      method: 'POST',
       headers: {
         'apikey': env.SUPABASE_SERVICE_KEY,
         'Authorization': `Bearer ${env.SUPABASE_SERVICE_KEY}`,
-        'Content-Type': 'application/json',
-        'Range': `${offset}-${offset + limit - 1}`,
-        'Prefer': 'count=exact'
-      }
+        'Content-Type': 'application/json'
+      },
+      body: JSON.stringify({
+        p_app_name: auth.appName,
+        p_query: q,
+        p_days: days,
+        p_app_version: version
+      })
     });
 
     if (!response.ok) {
-      console.error('Supabase query failed:', response.status, response.statusText);
+      console.error('Supabase search query failed:', response.status, response.statusText);
       return new Response(JSON.stringify({
-        error: 'Failed to fetch crash reports'
+        error: 'Failed to search crash reports'
       }), {
         status: 500,
         headers: { ...corsHeaders, 'Content-Type': 'application/json' }
@@ -605,21 +874,101 @@ async function handleCrashReportRead(request, env, corsHeaders) {
     }
 
     const crashReports = await response.json();
-    const totalCount = response.headers.get('Content-Range')?.split('/')[1] || '0';
 
     return new Response(JSON.stringify({
       success: true,
       data: crashReports,
-      pagination: {
-        limit,
-        offset,
-        total: parseInt(totalCount),
-        has_more: offset + limit < parseInt(totalCount)
+      filters: {
+        app_name: auth.appName,
+        app_version: version,
+        days,
+        q
+      }
+    }), {
+      status: 200,
+      headers: { ...corsHeaders, 'Content-Type': 'application/json' }
+    });
+
+  } catch (error) {
+    console.error('Search handler error:', error);
+    return new Response(JSON.stringify({
+      error: 'Internal server error'
+    }), {
+      status: 500,
+      headers: { ...corsHeaders, 'Content-Type': 'application/json' }
+    });
+  }
+}
+
+/**
+ * Handle crash report counting (GET /count[?q=...])
+ * Returns only the number of matching reports via count_crash_reports()
+ */
+async function handleCrashCountRead(request, env, corsHeaders) {
+  try {
+    const auth = await authorizeReadRequest(request, env, corsHeaders);
+    if (auth.error) {
+      return auth.error;
+    }
+
+    const url = new URL(request.url);
+    const q = url.searchParams.get('q') || null;
+    const days = parseInt(url.searchParams.get('days') || '30');
+    const { version } = auth;
+
+    if (q && q.length > 200) {
+      return new Response(JSON.stringify({
+        error: 'Query must be at most 200 characters'
+      }), {
+        status: 400,
+        headers: { ...corsHeaders, 'Content-Type': 'application/json' }
+      });
+    }
+
+    if (days > 365 || days < 1) {
+      return new Response(JSON.stringify({
+        error: 'Days must be between 1 and 365'
+      }), {
+        status: 400,
+        headers: { ...corsHeaders, 'Content-Type': 'application/json' }
+      });
+    }
+
+    const response = await fetch(`${env.SUPABASE_URL}/rest/v1/rpc/count_crash_reports`, {
+      method: 'POST',
+      headers: {
+        'apikey': env.SUPABASE_SERVICE_KEY,
+        'Authorization': `Bearer ${env.SUPABASE_SERVICE_KEY}`,
+        'Content-Type': 'application/json'
       },
+      body: JSON.stringify({
+        p_app_name: auth.appName,
+        p_days: days,
+        p_app_version: version,
+        p_query: q
+      })
+    });
+
+    if (!response.ok) {
+      console.error('Supabase count query failed:', response.status, response.statusText);
+      return new Response(JSON.stringify({
+        error: 'Failed to count crash reports'
+      }), {
+        status: 500,
+        headers: { ...corsHeaders, 'Content-Type': 'application/json' }
+      });
+    }
+
+    const count = await response.json();
+
+    return new Response(JSON.stringify({
+      success: true,
+      count,
       filters: {
-        app_name: appName,
+        app_name: auth.appName,
         app_version: version,
-        days
+        days,
+        q
       }
     }), {
       status: 200,
@@ -627,7 +976,7 @@ async function handleCrashReportRead(request, env, corsHeaders) {
     });
 
   } catch (error) {
-    console.error('Read handler error:', error);
+    console.error('Count handler error:', error);
     return new Response(JSON.stringify({
       error: 'Internal server error'
     }), {
@@ -637,6 +986,38 @@ async function handleCrashReportRead(request, env, corsHeaders) {
   }
 }
 
+/**
+ * Utility: Encode a report's (created_at, id) as an opaque pagination cursor
+ */
+function encodeCursor(report) {
+  return btoa(JSON.stringify([report.created_at, report.id]))
+    .replace(/\+/g, '-')
+    .replace(/\//g, '_')
+    .replace(/=+$/, '');
+}
+
+/**
+ * Utility: Decode a pagination cursor, returning null if it is malformed
+ */
+function decodeCursor(value) {
+  try {
+    const base64 = value.replace(/-/g, '+').replace(/_/g, '/');
+    const [createdAt, id] = JSON.parse(atob(base64));
+
+    // Only allow values that are safe to embed in a PostgREST filter
+    if (typeof createdAt !== 'string' || !/^[0-9T:.+\- Z]+$/.test(createdAt) || isNaN(new Date(createdAt).getTime())) {
+      return null;
+    }
+    if (typeof id !== 'string' || !/^[0-9a-f-]{36}$/i.test(id)) {
+      return null;
+    }
+
+    return { created_at: createdAt, id };
+  } catch (e) {
+    return null;
+  }
+}
+
 /**
  * Utility: Convert hex string to bytes
  */